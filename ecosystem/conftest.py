@@ -8,6 +8,15 @@ This file configures pytest settings for all ecosystem tests, including:
 import os
 import pytest
 
+# Node-id substrings that select tests for each marker
+# (the requests scenarios talk to the local httpbin_url server instead)
+_NETWORK_TOKENS = ("httpx",)
+_SLOW_TOKENS = ("test_httpx.py::test_bundled_timeout",)
+
+# Resolve the mark decorators once instead of per collected item
+_NETWORK_MARK = pytest.mark.network
+_SLOW_MARK = pytest.mark.slow
+
 
 def pytest_configure(config):
     """Configure pytest with custom settings for ecosystem tests."""
@@ -19,10 +28,12 @@ def pytest_configure(config):
 def pytest_collection_modifyitems(config, items):
     """Add markers to tests based on their characteristics."""
     for item in items:
-        # Mark all httpx and requests tests as network tests
-        if "httpx" in item.nodeid or "requests" in item.nodeid:
-            item.add_marker(pytest.mark.network)
+        nodeid = item.nodeid
+
+        # Mark httpx tests as network tests (requests uses the local httpbin_url server)
+        if any(token in nodeid for token in _NETWORK_TOKENS):
+            item.add_marker(_NETWORK_MARK)
 
         # Mark specific slow tests
-        if "test_bundled_timeout" in item.nodeid or "test_bundled_async" in item.nodeid:
-            item.add_marker(pytest.mark.slow)
+        if any(token in nodeid for token in _SLOW_TOKENS):
+            item.add_marker(_SLOW_MARK)
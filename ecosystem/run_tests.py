@@ -11,18 +11,20 @@ Usage:
 
     # Run in CI mode (xfail tests don't fail)
     python ecosystem/run_tests.py --ci
+
+    # Run pytest in a separate interpreter instead of in-process
+    python ecosystem/run_tests.py --fork
 """
 
 import sys
 import subprocess
-from pathlib import Path
 
 
 def main():
     args = sys.argv[1:]
 
-    # Base pytest command
-    cmd = ["python", "-m", "pytest"]
+    # pytest arguments (without the interpreter/module prefix)
+    pytest_args = []
 
     # Check if running in CI mode
     ci_mode = "--ci" in args
@@ -31,15 +33,20 @@ def main():
         print("Running in CI mode (xfail tests will be marked as expected failures)")
     else:
         print("Running in local mode (showing actual errors for xfail tests)")
-        cmd.append("--runxfail")
+        pytest_args.append("--runxfail")
+
+    # Check if a clean child interpreter was requested
+    fork = "--fork" in args
+    if fork:
+        args.remove("--fork")
 
     # Add verbosity and better output
-    cmd.extend(["-xvs", "--tb=short"])
+    pytest_args.extend(["-xvs", "--tb=short"])
 
     # Determine what to test
     if not args:
         # Run all ecosystem tests
-        cmd.append("ecosystem/scenarios/test_*.py")
+        pytest_args.append("ecosystem/scenarios")
     else:
         # Run specific test file(s)
         for arg in args:
@@ -47,13 +54,30 @@ def main():
                 arg = f"test_{arg}"
             if not arg.endswith(".py"):
                 arg = f"{arg}.py"
-            cmd.append(f"ecosystem/scenarios/{arg}")
+            pytest_args.append(f"ecosystem/scenarios/{arg}")
 
-    print(f"Running: {' '.join(cmd)}")
+    if not fork:
+        try:
+            import pytest
+        except ImportError:
+            # A child process on this interpreter would fail the same way
+            print(
+                f"❌ pytest is not installed for {sys.executable}; "
+                "install the ecosystem dependencies (uv sync) first",
+                file=sys.stderr,
+            )
+            return 1
+
+    cmd = [sys.executable, "-m", "pytest", *pytest_args]
+    print(f"Running: {' '.join(cmd)}" + ("" if fork else " (in-process)"))
     print("-" * 60)
 
-    result = subprocess.run(cmd)
-    return result.returncode
+    if fork:
+        result = subprocess.run(cmd)
+        return result.returncode
+
+    # Run inside this interpreter to skip a second interpreter start-up
+    return int(pytest.main(pytest_args))
 
 
 if __name__ == "__main__":
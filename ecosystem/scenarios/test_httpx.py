@@ -7,18 +7,19 @@ This script:
 3. Verifies async HTTP functionality works correctly
 """
 
+import asyncio
+import logging
 import os
+import socket
 import sys
-from pathlib import Path
+import time
 from typing import TYPE_CHECKING
 
 import pytest
 
 from .utils import (
-    run_cribo,
-    format_bundle_size,
+    PACKAGES_DIR,
     load_bundled_module,
-    ensure_test_directories,
     get_package_requirements,
     parse_requirements_file,
 )
@@ -28,51 +29,179 @@ if TYPE_CHECKING:
     pass
 
 
+logger = logging.getLogger(__name__)
+
 # Default timeout for HTTP requests - longer in CI environments
 DEFAULT_TIMEOUT = 40 if os.environ.get("CI") else 30
 
+HTTPBINGO_HOST = "httpbingo.org"
+
+
+# httpbingo answers with these under load; retry them (and dropped connections)
+# with backoff instead of failing the test outright
+RETRY_DELAYS = (0.1, 0.3, 0.9)
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+def robust_request(httpx, client, method, url, **kwargs):
+    """Send a request, retrying transient httpbingo failures with backoff.
+
+    Args:
+        httpx: The loaded httpx module (for its exception types)
+        client: Client to send the request with
+        method: HTTP method
+        url: URL, relative to the client's base_url
+        **kwargs: Passed to `client.request`
+
+    Returns:
+        The first response whose status is not a transient 5xx. Marks the test
+        as xfail if every attempt failed transiently.
+    """
+    for delay in (*RETRY_DELAYS, None):
+        try:
+            resp = client.request(method, url, **kwargs)
+        except (httpx.RemoteProtocolError, httpx.ReadTimeout) as exc:
+            reason = f"{type(exc).__name__}: {exc}"
+        else:
+            if resp.status_code not in RETRY_STATUS_CODES:
+                return resp
+            reason = f"HTTP {resp.status_code}"
+        if delay is not None:
+            time.sleep(delay)
+    pytest.xfail(f"httpbingo unavailable after {len(RETRY_DELAYS)} retries ({reason})")
+
+
+async def robust_request_async(httpx, client, method, url, **kwargs):
+    """Async counterpart of `robust_request` for `AsyncClient`."""
+    for delay in (*RETRY_DELAYS, None):
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except (httpx.RemoteProtocolError, httpx.ReadTimeout) as exc:
+            reason = f"{type(exc).__name__}: {exc}"
+        else:
+            if resp.status_code not in RETRY_STATUS_CODES:
+                return resp
+            reason = f"HTTP {resp.status_code}"
+        if delay is not None:
+            await asyncio.sleep(delay)
+    pytest.xfail(f"httpbingo unavailable after {len(RETRY_DELAYS)} retries ({reason})")
+
+
+def _pin_request(request, ip):
+    """Point a request for httpbingo at `ip`, keeping the hostname for Host and SNI."""
+    if request.url.host == HTTPBINGO_HOST:
+        request.url = request.url.copy_with(host=ip)
+        request.extensions = {**request.extensions, "sni_hostname": HTTPBINGO_HOST}
+
+
+def pinned_transport(httpx, ip, asynchronous=False, **transport_kwargs):
+    """Build a transport that connects to a pre-resolved address for httpbingo.
+
+    The URL host is swapped for `ip` just before sending, while the Host header
+    (fixed when the request was built) and the TLS SNI keep the real hostname.
+    For async clients this also keeps cold connects from handing getaddrinfo
+    off to the loop's executor thread.
+
+    Args:
+        httpx: The loaded httpx module
+        ip: Resolved address of httpbingo.org, or None to resolve normally
+        asynchronous: Build an `AsyncHTTPTransport` instead of an `HTTPTransport`
+        **transport_kwargs: Passed to the transport (e.g. ``http2=True``)
+
+    Returns:
+        A transport instance, or None when `ip` is None
+    """
+    if ip is None:
+        return None
+
+    if asynchronous:
+
+        class AsyncPinnedDNSTransport(httpx.AsyncHTTPTransport):
+            async def handle_async_request(self, request):
+                _pin_request(request, ip)
+                return await super().handle_async_request(request)
+
+        return AsyncPinnedDNSTransport(**transport_kwargs)
+
+    class PinnedDNSTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            _pin_request(request, ip)
+            return super().handle_request(request)
+
+    return PinnedDNSTransport(**transport_kwargs)
+
 
 @pytest.fixture(scope="module")
-def bundled_httpx():
-    """Bundle the httpx library and return the bundled module path."""
-    # Ensure test directories exist
-    tmp_dir = ensure_test_directories()
-
-    # Create isolated directory for httpx output
-    httpx_output_dir = tmp_dir / "httpx"
-    httpx_output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Paths
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "httpx"
-    httpx_init = package_root / "httpx"
-    bundled_output = httpx_output_dir / "httpx_bundled.py"
-    bundled_output.unlink(missing_ok=True)  # Remove if exists
-
-    print("\n🔧 Bundling httpx library...")
-    result = run_cribo(
-        str(httpx_init),
-        str(bundled_output),
-        emit_requirements=True,
-    )
+def httpx_mod(bundled_httpx):
+    """Load the bundled httpx module once for the whole test module."""
+    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
+        yield httpx
+
 
-    assert result.returncode == 0, f"Failed to bundle httpx: {result.stderr}"
+@pytest.fixture(scope="module")
+def httpbingo_ip():
+    """Resolve httpbingo.org once for every client built in this module.
 
-    bundle_size = bundled_output.stat().st_size
-    print(f"✅ Successfully bundled to {bundled_output}")
-    print(f"   Bundle size: {format_bundle_size(bundle_size)}")
+    Returns None when resolution fails, so clients fall back to their own lookup.
+    """
+    try:
+        addrinfo = socket.getaddrinfo(HTTPBINGO_HOST, 443, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return None
+    return addrinfo[0][4][0]
 
-    # Check requirements.txt generation
-    requirements_path = bundled_output.parent / "requirements.txt"
-    assert requirements_path.exists(), "requirements.txt was not generated!"
 
-    requirements_content = requirements_path.read_text().strip()
-    print(f"\n📋 Generated requirements.txt at: {requirements_path}")
-    print("   Content:")
-    for line in requirements_content.splitlines():
-        print(f"     - {line}")
+@pytest.fixture(scope="module")
+def httpx_client(httpx_mod, httpbingo_ip):
+    """Shared client for the smoke tests so they reuse one pooled connection.
+
+    Top-level `httpx.get`/`httpx.post` open a new TCP+TLS connection per call.
+    HTTP/2 is offered so requests multiplex over that connection; HTTP/1.1
+    remains available in case the server does not negotiate h2.
+    """
+    with httpx_mod.Client(
+        base_url="https://httpbingo.org",
+        timeout=DEFAULT_TIMEOUT,
+        http2=True,
+        transport=pinned_transport(httpx_mod, httpbingo_ip, http2=True),
+    ) as client:
+        yield client
 
-    # Return path for loading
-    return bundled_output
+
+@pytest.fixture(scope="module")
+def httpx_event_loop():
+    """Event loop shared by the async tests in this module.
+
+    Avoids building and tearing down a loop per test with `asyncio.run`.
+    Not named `event_loop`, which pytest-asyncio reserves.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop
+    # Mirror asyncio.run's teardown so pending async generators and the
+    # default executor (used for DNS lookups) are finalized before closing
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+    finally:
+        loop.close()
+
+
+@pytest.fixture(scope="module")
+def async_httpx_client(httpx_mod, httpbingo_ip, httpx_event_loop):
+    """Shared AsyncClient bound to the module event loop.
+
+    HTTP/2 lets concurrent requests share one connection as streams.
+    """
+    client = httpx_mod.AsyncClient(
+        base_url="https://httpbingo.org",
+        timeout=DEFAULT_TIMEOUT,
+        http2=True,
+        transport=pinned_transport(
+            httpx_mod, httpbingo_ip, asynchronous=True, http2=True
+        ),
+    )
+    yield client
+    httpx_event_loop.run_until_complete(client.aclose())
 
 
 def test_bundle_generation(bundled_httpx):
@@ -90,146 +219,126 @@ def test_requirements_generation(bundled_httpx):
     found_deps = parse_requirements_file(requirements_path)
 
     # Get expected dependencies from pyproject.toml
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "httpx"
+    package_root = PACKAGES_DIR / "httpx"
     package_reqs = get_package_requirements(package_root)
 
     # Check for expected dependencies (both sets are already normalized)
     expected_deps = package_reqs["install_requires"]
-    missing_deps = expected_deps - found_deps
+    if not expected_deps <= found_deps:
+        missing_deps = expected_deps - found_deps
 
-    # Note: anyio is a transitive dependency through httpcore that cribo may not detect
-    # directly from httpx's imports
-    if missing_deps == {"anyio"}:
-        pytest.skip("anyio is a transitive dependency not directly imported by httpx")
+        # Note: anyio is a transitive dependency through httpcore that cribo may
+        # not detect directly from httpx's imports
+        if missing_deps == {"anyio"}:
+            pytest.skip(
+                "anyio is a transitive dependency not directly imported by httpx"
+            )
 
-    # We should detect all required dependencies
-    assert not missing_deps, f"Missing required dependencies: {missing_deps}"
+        # We should detect all required dependencies
+        assert not missing_deps, f"Missing required dependencies: {missing_deps}"
 
     # Check for optional dependencies
     optional_deps = package_reqs["extras_require"]
-    detected_optional = found_deps & optional_deps
-
-    if detected_optional:
-        print(f"   ℹ️  Optional dependencies detected: {detected_optional}")
+    if not found_deps.isdisjoint(optional_deps):
+        logger.debug(
+            "ℹ️  Optional dependencies detected: %s", found_deps & optional_deps
+        )
 
 
-def test_bundled_module_loading(bundled_httpx):
+def test_bundled_module_loading(httpx_mod):
     """Test that the bundled module can be loaded."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        # Just test that we can import and access basic attributes
-        assert hasattr(httpx, "get")
-        assert hasattr(httpx, "post")
-        assert hasattr(httpx, "Client")
-        assert hasattr(httpx, "AsyncClient")
+    # Just test that we can import and access basic attributes
+    missing = {"get", "post", "Client", "AsyncClient"} - set(dir(httpx_mod))
+    assert not missing, f"Missing from bundled httpx: {missing}"
 
 
-def test_bundled_get_request(bundled_httpx):
+def test_bundled_get_request(httpx_mod, httpx_client):
     """Test basic GET request with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        # httpx uses synchronous requests with increased timeout
-        resp = httpx.get("https://httpbingo.org/get", timeout=DEFAULT_TIMEOUT)
-        assert resp.status_code == 200
-        data = resp.json()
-        assert "headers" in data
-        assert "origin" in data
+    resp = robust_request(httpx_mod, httpx_client, "GET", "/get")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "headers" in data
+    assert "origin" in data
 
 
-def test_bundled_post_request(bundled_httpx):
+def test_bundled_post_request(httpx_mod, httpx_client):
     """Test POST request with JSON data using bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        test_data = {"key": "value", "number": 42}
-        resp = httpx.post(
-            "https://httpbingo.org/post", json=test_data, timeout=DEFAULT_TIMEOUT
-        )
-        assert resp.status_code == 200
-        response_data = resp.json()
-        assert response_data["json"] == test_data
+    test_data = {"key": "value", "number": 42}
+    resp = robust_request(httpx_mod, httpx_client, "POST", "/post", json=test_data)
+    assert resp.status_code == 200
+    response_data = resp.json()
+    assert response_data["json"] == test_data
 
 
-def test_bundled_custom_headers(bundled_httpx):
+def test_bundled_custom_headers(httpx_mod, httpx_client):
     """Test custom headers with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        headers = {"User-Agent": "cribo-test/1.0", "X-Test-Header": "test-value"}
-        resp = httpx.get(
-            "https://httpbingo.org/headers", headers=headers, timeout=DEFAULT_TIMEOUT
-        )
-        assert resp.status_code == 200
-        response_headers = resp.json()["headers"]
-        assert response_headers.get("User-Agent") == ["cribo-test/1.0"]
-        assert response_headers.get("X-Test-Header") == ["test-value"]
+    headers = {"User-Agent": "cribo-test/1.0", "X-Test-Header": "test-value"}
+    resp = robust_request(httpx_mod, httpx_client, "GET", "/headers", headers=headers)
+    assert resp.status_code == 200
+    response_headers = resp.json()["headers"]
+    assert response_headers.get("User-Agent") == ["cribo-test/1.0"]
+    assert response_headers.get("X-Test-Header") == ["test-value"]
 
 
-def test_bundled_query_params(bundled_httpx):
+def test_bundled_query_params(httpx_mod, httpx_client):
     """Test query parameters with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        params = {"foo": "bar", "baz": "123"}
-        resp = httpx.get(
-            "https://httpbingo.org/get", params=params, timeout=DEFAULT_TIMEOUT
-        )
-        assert resp.status_code == 200
-        args = resp.json()["args"]
-        assert args["foo"] == [params["foo"]]
-        assert args["baz"] == [params["baz"]]
+    params = {"foo": "bar", "baz": "123"}
+    resp = robust_request(httpx_mod, httpx_client, "GET", "/get", params=params)
+    assert resp.status_code == 200
+    args = resp.json()["args"]
+    assert args["foo"] == [params["foo"]]
+    assert args["baz"] == [params["baz"]]
 
 
-def test_bundled_client_usage(bundled_httpx):
+def test_bundled_client_usage(httpx_mod, httpbingo_ip):
     """Test Client context manager with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        # Test using Client context manager with increased timeout
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.get("https://httpbingo.org/get")
-            assert resp.status_code == 200
+    # Test using Client context manager with increased timeout
+    with httpx_mod.Client(
+        timeout=DEFAULT_TIMEOUT, transport=pinned_transport(httpx_mod, httpbingo_ip)
+    ) as client:
+        resp = robust_request(httpx_mod, client, "GET", "https://httpbingo.org/get")
+        assert resp.status_code == 200
 
-            # Test persistent headers with client
-            client.headers.update({"X-Client-Header": "test"})
-            resp = client.get("https://httpbingo.org/headers")
-            headers = resp.json()["headers"]
-            assert headers.get("X-Client-Header") == ["test"]
+        # Test persistent headers with client
+        client.headers.update({"X-Client-Header": "test"})
+        resp = robust_request(httpx_mod, client, "GET", "https://httpbingo.org/headers")
+        headers = resp.json()["headers"]
+        assert headers.get("X-Client-Header") == ["test"]
 
 
-def test_bundled_timeout(bundled_httpx):
+def test_bundled_timeout(httpx_mod):
     """Test timeout handling with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        # httpx uses different timeout API than requests
-        with pytest.raises(httpx.TimeoutException):
-            httpx.get("https://httpbingo.org/delay/10", timeout=2)
+    # httpx uses different timeout API than requests
+    with pytest.raises(httpx_mod.TimeoutException):
+        httpx_mod.get("https://httpbingo.org/delay/10", timeout=2)
 
 
-def test_bundled_status_codes(bundled_httpx):
+def test_bundled_status_codes(httpx_mod, httpx_client):
     """Test various status codes with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        resp = httpx.get("https://httpbingo.org/status/404", timeout=DEFAULT_TIMEOUT)
-        assert resp.status_code == 404
+    resp = robust_request(httpx_mod, httpx_client, "GET", "/status/404")
+    assert resp.status_code == 404
 
-        resp = httpx.get("https://httpbingo.org/status/500", timeout=DEFAULT_TIMEOUT)
-        assert resp.status_code == 500
+    resp = robust_request(httpx_mod, httpx_client, "GET", "/status/500")
+    assert resp.status_code == 500
 
 
-def test_bundled_async_client(bundled_httpx):
+def test_bundled_async_client(httpx_mod, async_httpx_client, httpx_event_loop):
     """Test AsyncClient functionality with bundled httpx."""
-    import asyncio
-
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-
-        async def async_test():
-            async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as client:
-                resp = await client.get("https://httpbingo.org/get")
-                assert resp.status_code == 200
-                data = resp.json()
-                assert "headers" in data
-
-        # Run the async test
-        asyncio.run(async_test())
+    resp = httpx_event_loop.run_until_complete(
+        robust_request_async(httpx_mod, async_httpx_client, "GET", "/get")
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "headers" in data
 
 
-def test_bundled_http2_support(bundled_httpx):
+def test_bundled_http2_support(httpx_mod):
     """Test HTTP/2 support with bundled httpx."""
-    with load_bundled_module(bundled_httpx, "httpx_bundled") as httpx:
-        # httpx supports HTTP/2 when httpcore[http2] is installed
-        # Just verify the option exists with increased timeout
-        client = httpx.Client(http2=True, timeout=DEFAULT_TIMEOUT)
-        assert client is not None
-        client.close()
+    # httpx supports HTTP/2 when httpcore[http2] is installed
+    # Just verify the option exists with increased timeout
+    client = httpx_mod.Client(http2=True, timeout=DEFAULT_TIMEOUT)
+    assert client is not None
+    client.close()
 
 
 if __name__ == "__main__":
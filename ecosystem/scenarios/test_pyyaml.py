@@ -8,67 +8,66 @@ This script:
 """
 
 import sys
-from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pytest
 
-from .utils import run_cribo, format_bundle_size, load_bundled_module, ensure_test_directories, get_package_requirements, parse_requirements_file
+from .utils import PACKAGES_DIR, load_bundled_module, get_package_requirements, parse_requirements_file
 
 # Type hint for better IDE support
 if TYPE_CHECKING:
     pass
 
 
+# YAML inputs, built once at import rather than on every test call
+BASIC_YAML = """
+name: Test Document
+version: 1.0
+features:
+  - parsing
+  - dumping
+  - safe_loading
+config:
+  debug: true
+  timeout: 30
+"""
+
+# YAML with multiple documents
+MULTI_DOC_YAML = """
+---
+document: 1
+type: first
+---
+document: 2
+type: second
+---
+document: 3
+type: third
+"""
+
+# YAML with anchors and aliases
+ANCHORS_YAML = """
+defaults: &defaults
+  adapter: postgres
+  host: localhost
+  port: 5432
+
+development:
+  <<: *defaults
+  database: dev_db
+
+production:
+  <<: *defaults
+  database: prod_db
+  host: prod.example.com
+"""
+
+
 @pytest.fixture(scope="module")
-def bundled_pyyaml():
-    """Bundle the pyyaml library and return the bundled module path."""
-    # Ensure test directories exist
-    tmp_dir = ensure_test_directories()
-
-    # Create isolated directory for pyyaml output
-    pyyaml_output_dir = tmp_dir / "pyyaml"
-    pyyaml_output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Paths
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "pyyaml"
-    yaml_init = package_root / "lib" / "yaml"
-    bundled_output = pyyaml_output_dir / "pyyaml_bundled.py"
-
-    print("\n🔧 Bundling pyyaml library...")
-    print("   Note: PyYAML has an optional C extension (_yaml) that will be ignored")
-    result = run_cribo(
-        str(yaml_init),
-        str(bundled_output),
-        emit_requirements=True,
-        # PyYAML is a pure Python library, tree-shaking should work
-    )
-
-    # PyYAML has optional C extensions that cribo now handles correctly:
-    # - yaml._yaml is detected as a NativeExtension and left as an import
-    # - The bundled code will work with the pure Python fallback
-
-    assert result.returncode == 0, f"Failed to bundle pyyaml: {result.stderr}"
-
-    bundle_size = bundled_output.stat().st_size
-    print(f"✅ Successfully bundled to {bundled_output}")
-    print(f"   Bundle size: {format_bundle_size(bundle_size)}")
-
-    # Check requirements.txt generation
-    requirements_path = bundled_output.parent / "requirements.txt"
-    assert requirements_path.exists(), "requirements.txt was not generated!"
-
-    requirements_content = requirements_path.read_text().strip()
-    print(f"\n📋 Generated requirements.txt at: {requirements_path}")
-    print("   Content:")
-    if requirements_content:
-        for line in requirements_content.splitlines():
-            print(f"     - {line}")
-    else:
-        print("     (empty - no external dependencies)")
-
-    # Return path for loading
-    return bundled_output
+def yaml_mod(bundled_pyyaml):
+    """Load the bundled pyyaml module once for the whole test module."""
+    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
+        yield yaml
 
 
 def test_bundle_generation(bundled_pyyaml):
@@ -86,7 +85,7 @@ def test_requirements_generation(bundled_pyyaml):
     found_deps = parse_requirements_file(requirements_path)
 
     # Get expected dependencies from setup.py
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "pyyaml"
+    package_root = PACKAGES_DIR / "pyyaml"
     package_reqs = get_package_requirements(package_root)
 
     # Check for expected dependencies (both sets are already normalized)
@@ -98,164 +97,112 @@ def test_requirements_generation(bundled_pyyaml):
     assert not missing_deps, f"Missing required dependencies: {missing_deps}"
 
 
-def test_bundled_module_loading(bundled_pyyaml):
+def test_bundled_module_loading(yaml_mod):
     """Test that the bundled module can be loaded."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Just test that we can import and access basic attributes
-        assert hasattr(yaml, "load")
-        assert hasattr(yaml, "dump")
-        assert hasattr(yaml, "SafeLoader")
-        assert hasattr(yaml, "SafeDumper")
+    # Just test that we can import and access basic attributes
+    missing = {"load", "dump", "SafeLoader", "SafeDumper"} - set(dir(yaml_mod))
+    assert not missing, f"Missing attributes: {missing}"
 
 
-def test_bundled_yaml_parsing(bundled_pyyaml):
+def test_bundled_yaml_parsing(yaml_mod):
     """Test YAML parsing with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Test parsing a simple YAML string
-        yaml_content = """
-        name: Test Document
-        version: 1.0
-        features:
-          - parsing
-          - dumping
-          - safe_loading
-        config:
-          debug: true
-          timeout: 30
-        """
-
-        data = yaml.safe_load(yaml_content)
-
-        assert data["name"] == "Test Document"
-        assert data["version"] == 1.0
-        assert "parsing" in data["features"]
-        assert data["config"]["debug"] is True
-        assert data["config"]["timeout"] == 30
-
-
-def test_bundled_yaml_dumping(bundled_pyyaml):
+    # Test parsing a simple YAML string
+    data = yaml_mod.safe_load(BASIC_YAML)
+
+    assert data["name"] == "Test Document"
+    assert data["version"] == 1.0
+    assert "parsing" in data["features"]
+    assert data["config"]["debug"] is True
+    assert data["config"]["timeout"] == 30
+
+
+def test_bundled_yaml_dumping(yaml_mod):
     """Test YAML dumping with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Test dumping Python data to YAML
-        data = {"name": "Generated Document", "items": ["apple", "banana", "cherry"], "metadata": {"created": "2024-01-01", "modified": "2024-01-02", "version": 2}, "active": True}
+    # Test dumping Python data to YAML
+    data = {"name": "Generated Document", "items": ["apple", "banana", "cherry"], "metadata": {"created": "2024-01-01", "modified": "2024-01-02", "version": 2}, "active": True}
 
-        yaml_output = yaml.dump(data, default_flow_style=False)
+    yaml_output = yaml_mod.dump(data, default_flow_style=False)
 
-        # Verify the output contains expected content
-        assert "name: Generated Document" in yaml_output
-        assert "apple" in yaml_output
-        assert "created:" in yaml_output
-        assert "active: true" in yaml_output
+    # Verify the output contains expected content
+    assert "name: Generated Document" in yaml_output
+    assert "apple" in yaml_output
+    assert "created:" in yaml_output
+    assert "active: true" in yaml_output
 
 
-def test_bundled_yaml_roundtrip(bundled_pyyaml):
+def test_bundled_yaml_roundtrip(yaml_mod):
     """Test YAML roundtrip (dump and load) with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Create test data
-        original_data = {"string": "hello world", "number": 42, "float": 3.14159, "boolean": True, "null_value": None, "list": [1, 2, 3, 4, 5], "nested": {"key1": "value1", "key2": ["a", "b", "c"], "key3": {"deep": "nested"}}}
+    # Create test data
+    original_data = {"string": "hello world", "number": 42, "float": 3.14159, "boolean": True, "null_value": None, "list": [1, 2, 3, 4, 5], "nested": {"key1": "value1", "key2": ["a", "b", "c"], "key3": {"deep": "nested"}}}
 
-        # Dump to YAML and load back
-        yaml_str = yaml.dump(original_data, default_flow_style=False)
-        loaded_data = yaml.safe_load(yaml_str)
+    # Dump to YAML and load back
+    yaml_str = yaml_mod.dump(original_data, default_flow_style=False)
+    loaded_data = yaml_mod.safe_load(yaml_str)
 
-        # Verify roundtrip preserves data
-        assert loaded_data == original_data
+    # Verify roundtrip preserves data
+    assert loaded_data == original_data
 
 
-def test_bundled_yaml_multiple_documents(bundled_pyyaml):
+def test_bundled_yaml_multiple_documents(yaml_mod):
     """Test handling multiple YAML documents with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # YAML with multiple documents
-        multi_doc_yaml = """
----
-document: 1
-type: first
----
-document: 2
-type: second
----
-document: 3
-type: third
-"""
-
-        # Load all documents
-        documents = list(yaml.safe_load_all(multi_doc_yaml))
+    # Load all documents
+    documents = list(yaml_mod.safe_load_all(MULTI_DOC_YAML))
 
-        assert len(documents) == 3
-        assert documents[0]["document"] == 1
-        assert documents[1]["type"] == "second"
-        assert documents[2]["document"] == 3
+    assert len(documents) == 3
+    assert documents[0]["document"] == 1
+    assert documents[1]["type"] == "second"
+    assert documents[2]["document"] == 3
 
 
-def test_bundled_yaml_anchors_and_aliases(bundled_pyyaml):
+def test_bundled_yaml_anchors_and_aliases(yaml_mod):
     """Test YAML anchors and aliases with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # YAML with anchors and aliases
-        yaml_content = """
-defaults: &defaults
-  adapter: postgres
-  host: localhost
-  port: 5432
-
-development:
-  <<: *defaults
-  database: dev_db
-
-production:
-  <<: *defaults
-  database: prod_db
-  host: prod.example.com
-"""
-
-        data = yaml.safe_load(yaml_content)
+    data = yaml_mod.safe_load(ANCHORS_YAML)
 
-        # Verify aliases were expanded correctly
-        assert data["development"]["adapter"] == "postgres"
-        assert data["development"]["host"] == "localhost"
-        assert data["development"]["database"] == "dev_db"
+    # Verify aliases were expanded correctly
+    assert data["development"]["adapter"] == "postgres"
+    assert data["development"]["host"] == "localhost"
+    assert data["development"]["database"] == "dev_db"
 
-        assert data["production"]["adapter"] == "postgres"
-        assert data["production"]["host"] == "prod.example.com"  # Overridden
-        assert data["production"]["database"] == "prod_db"
+    assert data["production"]["adapter"] == "postgres"
+    assert data["production"]["host"] == "prod.example.com"  # Overridden
+    assert data["production"]["database"] == "prod_db"
 
 
-def test_bundled_yaml_custom_tags(bundled_pyyaml):
+def test_bundled_yaml_custom_tags(yaml_mod):
     """Test custom YAML tags with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Test that we can at least access the constructor mechanism
-        # assert hasattr(yaml, "YAMLObject")
-        # assert hasattr(yaml, "Constructor")
+    # Test that we can at least access the constructor mechanism
+    # assert hasattr(yaml_mod, "YAMLObject")
+    # assert hasattr(yaml_mod, "Constructor")
 
-        # Test basic tag handling
-        yaml_with_tag = """
-        !!python/tuple [1, 2, 3]
-        """
+    # Test basic tag handling
+    yaml_with_tag = """
+    !!python/tuple [1, 2, 3]
+    """
 
-        # Use Loader instead of SafeLoader for this test
-        # Note: In production, avoid using unsafe loaders
-        data = yaml.load(yaml_with_tag, Loader=yaml.Loader)
-        assert isinstance(data, tuple)
-        assert data == (1, 2, 3)
+    # Use Loader instead of SafeLoader for this test
+    # Note: In production, avoid using unsafe loaders
+    data = yaml_mod.load(yaml_with_tag, Loader=yaml_mod.Loader)
+    assert isinstance(data, tuple)
+    assert data == (1, 2, 3)
 
 
-def test_bundled_yaml_flow_style(bundled_pyyaml):
+def test_bundled_yaml_flow_style(yaml_mod):
     """Test different YAML flow styles with bundled pyyaml."""
-    with load_bundled_module(bundled_pyyaml, "pyyaml_bundled") as yaml:
-        # Test data
-        data = {"inline_list": [1, 2, 3], "inline_dict": {"a": 1, "b": 2}}
+    # Test data
+    data = {"inline_list": [1, 2, 3], "inline_dict": {"a": 1, "b": 2}}
 
-        # Dump with flow style
-        flow_output = yaml.dump(data, default_flow_style=True)
-        assert "{" in flow_output  # Flow style uses braces
-        assert "[" in flow_output  # Flow style uses brackets
+    # Dump with flow style
+    flow_output = yaml_mod.dump(data, default_flow_style=True)
+    assert "{" in flow_output  # Flow style uses braces
+    assert "[" in flow_output  # Flow style uses brackets
 
-        # Dump with block style
-        block_output = yaml.dump(data, default_flow_style=False)
-        assert "- " in block_output  # Block style uses dashes for lists
+    # Dump with block style
+    block_output = yaml_mod.dump(data, default_flow_style=False)
+    assert "- " in block_output  # Block style uses dashes for lists
 
-        # Both should parse back to the same data
-        assert yaml.safe_load(flow_output) == data
-        assert yaml.safe_load(block_output) == data
+    # Both should parse back to the same data
+    assert yaml_mod.safe_load(flow_output) == data
+    assert yaml_mod.safe_load(block_output) == data
 
 
 if __name__ == "__main__":
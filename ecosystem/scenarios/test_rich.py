@@ -7,13 +7,15 @@ This script:
 3. Verifies core functionality works correctly
 """
 
+import logging
 import sys
-from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pytest
 
-from .utils import run_cribo, format_bundle_size, load_bundled_module, ensure_test_directories, get_package_requirements, parse_requirements_file
+from .utils import load_bundled_module
+
+logger = logging.getLogger(__name__)
 
 # Type hint for better IDE support
 if TYPE_CHECKING:
@@ -21,46 +23,10 @@ if TYPE_CHECKING:
 
 
 @pytest.fixture(scope="module")
-def bundled_rich():
-    """Bundle the rich library and return the bundled module path."""
-    # Ensure test directories exist
-    tmp_dir = ensure_test_directories()
-
-    # Create isolated directory for rich output
-    rich_output_dir = tmp_dir / "rich"
-    rich_output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Paths - Updated to use Path.resolve() for robustness
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "rich"
-    rich_init = package_root / "rich"
-    bundled_output = rich_output_dir / "rich_bundled.py"
-
-    print("\n🔧 Bundling rich library...")
-    result = run_cribo(
-        str(rich_init),
-        str(bundled_output),
-        emit_requirements=True,
-        # Rich uses dynamic imports extensively, but we'll test with tree-shaking enabled
-    )
-
-    assert result.returncode == 0, f"Failed to bundle rich: {result.stderr}"
-
-    bundle_size = bundled_output.stat().st_size
-    print(f"✅ Successfully bundled to {bundled_output}")
-    print(f"   Bundle size: {format_bundle_size(bundle_size)}")
-
-    # Check requirements.txt generation
-    requirements_path = bundled_output.parent / "requirements.txt"
-    assert requirements_path.exists(), "requirements.txt was not generated!"
-
-    requirements_content = requirements_path.read_text().strip()
-    print(f"\n📋 Generated requirements.txt at: {requirements_path}")
-    print("   Content:")
-    for line in requirements_content.splitlines():
-        print(f"     - {line}")
-
-    # Return path for loading
-    return bundled_output
+def rich_mod(bundled_rich):
+    """Load the bundled rich module once for the whole test module."""
+    with load_bundled_module(bundled_rich, "rich_bundled") as rich:
+        yield rich
 
 
 def test_bundle_generation(bundled_rich):
@@ -69,61 +35,47 @@ def test_bundle_generation(bundled_rich):
     assert bundled_rich.stat().st_size > 0
 
 
-def test_requirements_generation(bundled_rich):
+def test_requirements_generation(rich_requirements):
     """Test that requirements.txt is generated with expected dependencies."""
-    requirements_path = bundled_rich.parent / "requirements.txt"
-    assert requirements_path.exists()
-
-    # Parse the generated requirements.txt
-    found_deps = parse_requirements_file(requirements_path)
-
-    # Get expected dependencies from pyproject.toml
-    package_root = Path(__file__).resolve().parent.parent / "packages" / "rich"
-    package_reqs = get_package_requirements(package_root)
-
     # Check for expected dependencies (both sets are already normalized)
-    expected_deps = package_reqs["install_requires"]
-    missing_deps = expected_deps - found_deps
+    missing_deps = rich_requirements.expected - rich_requirements.found
 
     # We should detect all required dependencies
     assert not missing_deps, f"Missing required dependencies: {missing_deps}"
 
     # Check for optional dependencies
-    optional_deps = package_reqs["extras_require"]
-    detected_optional = found_deps & optional_deps
+    detected_optional = rich_requirements.found & rich_requirements.optional
 
     if detected_optional:
-        print(f"   ℹ️  Optional dependencies detected: {detected_optional}")
+        logger.debug("ℹ️  Optional dependencies detected: %s", detected_optional)
 
 
-def test_bundled_module_loading(bundled_rich):
+def test_bundled_module_loading(rich_mod):
     """Test that the bundled module can be loaded and has expected top-level exports."""
-    with load_bundled_module(bundled_rich, "rich_bundled") as rich:
-        # Test that the top-level exports from rich are available
-        # These are what you get with 'import rich' in normal Python
-        assert hasattr(rich, "print"), "Missing rich.print function"
-        assert hasattr(rich, "get_console"), "Missing rich.get_console function"
-        assert hasattr(rich, "inspect"), "Missing rich.inspect function"
+    # Test that the top-level exports from rich are available
+    # These are what you get with 'import rich' in normal Python
+    assert hasattr(rich_mod, "print"), "Missing rich.print function"
+    assert hasattr(rich_mod, "get_console"), "Missing rich.get_console function"
+    assert hasattr(rich_mod, "inspect"), "Missing rich.inspect function"
 
-        # Note: We cannot test submodule imports like 'from rich.console import Console'
-        # because the bundle is a single file, not a package structure.
-        # This is a fundamental limitation of bundling.
+    # Note: We cannot test submodule imports like 'from rich.console import Console'
+    # because the bundle is a single file, not a package structure.
+    # This is a fundamental limitation of bundling.
 
 
-def test_bundled_print_functionality(bundled_rich):
+def test_bundled_print_functionality(rich_mod):
     """Test rich.print functionality using top-level exports."""
-    with load_bundled_module(bundled_rich, "rich_bundled") as rich:
-        # Use the top-level print function with StringIO
-        import io
+    # Use the top-level print function with StringIO
+    import io
 
-        output = io.StringIO()
+    output = io.StringIO()
 
-        # rich.print is a top-level export that should work
-        rich.print("Hello, World!", file=output)
-        result = output.getvalue()
+    # rich.print is a top-level export that should work
+    rich_mod.print("Hello, World!", file=output)
+    result = output.getvalue()
 
-        # The output might have ANSI codes, but should contain our text
-        assert "Hello, World!" in result
+    # The output might have ANSI codes, but should contain our text
+    assert "Hello, World!" in result
 
 
 if __name__ == "__main__":
@@ -1,26 +1,59 @@
 """Shared utilities for ecosystem test scenarios."""
 
+import ast
+import functools
+import hashlib
+import importlib.machinery
 import importlib.util
+import json
 import os
+import py_compile
+import re
 import sys
 import subprocess
 from pathlib import Path
-from typing import List, Set, Dict
+from types import MappingProxyType, ModuleType
+from typing import List, Set, Dict, FrozenSet, Mapping, Optional, Tuple
 from contextlib import contextmanager
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
-def ensure_test_directories():
+# Whether bundle_lock() can serialize bundling across processes on this platform
+BUNDLE_LOCKING = fcntl is not None
+
+# Workspace root (ecosystem/scenarios/utils.py -> ../..), resolved once at import
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+_TMP_DIR = _PROJECT_ROOT / "target" / "tmp"
+
+# Git submodules of the ecosystem packages under test
+PACKAGES_DIR = _PROJECT_ROOT / "ecosystem" / "packages"
+
+
+def ensure_test_directories(per_worker: bool = True):
     """Ensure all necessary test directories exist.
 
     Creates:
     - target/tmp: For temporary bundled output files
+    - target/tmp/<worker>: Instead, when running under pytest-xdist with
+      per_worker set, so concurrent workers never unlink or overwrite each
+      other's bundles
+
+    Args:
+        per_worker: Whether to isolate pytest-xdist workers in their own
+            directory. Pass False when writes are serialized with bundle_lock().
 
     Returns:
         Path to the tmp directory
     """
-    # Get project root (ecosystem/scenarios/utils.py -> ../..)
-    project_root = Path(__file__).resolve().parent.parent.parent
-    tmp_dir = project_root / "target" / "tmp"
+    tmp_dir = _TMP_DIR
+
+    # pytest-xdist exports the worker id (gw0, gw1, ...) to each worker process
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if per_worker and worker_id:
+        tmp_dir = tmp_dir / worker_id
 
     # Create directory if it doesn't exist
     tmp_dir.mkdir(parents=True, exist_ok=True)
@@ -28,30 +61,94 @@ def ensure_test_directories():
     return tmp_dir
 
 
-def run_cribo(entry_point: str, output_path: str, emit_requirements: bool = True, tree_shake: bool = False, verbose: bool = False) -> subprocess.CompletedProcess:
-    """Run cribo to bundle a Python module.
+@contextmanager
+def bundle_lock(lock_path: Path):
+    """Hold an exclusive inter-process lock on lock_path for the duration of the block.
+
+    Uses flock(), which the OS drops if the holder dies, so a crashed run cannot
+    leave the lock stuck. A no-op where fcntl is unavailable (see BUNDLE_LOCKING).
 
     Args:
-        entry_point: Path to the entry point Python file
-        output_path: Path where the bundled output should be saved
-        emit_requirements: Whether to generate requirements.txt (default: True)
-        tree_shake: Whether to enable tree-shaking (default: False)
-        verbose: Whether to show verbose output (default: False)
+        lock_path: Lock file to create (if needed) and lock
+    """
+    if fcntl is None:
+        yield
+        return
 
-    Returns:
-        CompletedProcess instance with the result of running cribo
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _pushed_sys_path(entry: str):
+    """Put entry at the front of sys.path for the duration of the block.
+
+    Only that one entry is removed afterwards, rather than copying the whole
+    of sys.path up front and restoring it.
     """
-    # Resolve workspace root (ecosystem/scenarios/utils.py -> ../../)
-    project_root = Path(__file__).resolve().parent.parent.parent
+    sys.path.insert(0, entry)
+    try:
+        yield
+    finally:
+        try:
+            sys.path.remove(entry)
+        except ValueError:
+            pass
+
+
+def package_source_signature(package_dir: Path) -> str:
+    """Compute a short signature of a package's Python sources.
+
+    Hashes each file's relative path, mtime and size rather than its contents,
+    so checking an unchanged package only costs one stat() per file.
+
+    Args:
+        package_dir: Directory containing the package's Python files
 
+    Returns:
+        16-character hex digest identifying the current state of the sources
+    """
+    # Walk with os.scandir so directory entries are classified from the readdir
+    # data instead of building and stat()ing a Path for every entry
+    sources = []
+    pending = [("", os.fspath(package_dir))]
+    while pending:
+        prefix, directory = pending.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            # Like rglob(), a missing directory (e.g. an uninitialized submodule) has no sources
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((f"{prefix}{entry.name}/", entry.path))
+                elif entry.name.endswith(".py"):
+                    stat = entry.stat()
+                    sources.append((f"{prefix}{entry.name}", stat.st_mtime_ns, stat.st_size))
+
+    digest = hashlib.blake2b(digest_size=8)
+    for relpath, mtime_ns, size in sorted(sources):
+        digest.update(f"{relpath}\0{mtime_ns}\0{size}\n".encode())
+    return digest.hexdigest()
+
+
+def cribo_command(entry_point: str, output_path: str, emit_requirements: bool = False, tree_shake: bool = False, verbose: bool = False) -> List[str]:
+    """Build the command line run_cribo executes for these arguments.
+
+    Uses the pre-built binary from CARGO_BIN_EXE_cribo when it exists, and
+    ``cargo run`` otherwise. Arguments are the same as for run_cribo.
+    """
     # Check if we're running from cargo test (CARGO_BIN_EXE_cribo is set)
     # This is much faster than cargo run since it uses the already-built binary
     cargo_bin = os.environ.get("CARGO_BIN_EXE_cribo")
 
     if cargo_bin and Path(cargo_bin).exists():
         # Use the pre-built binary from cargo test
-        if verbose:
-            print(f"  Using pre-built binary: {cargo_bin}")
         cmd: List[str] = [
             cargo_bin,
             "--entry",
@@ -61,8 +158,6 @@ def run_cribo(entry_point: str, output_path: str, emit_requirements: bool = True
         ]
     else:
         # Fallback to cargo run for development
-        if verbose:
-            print("  Using cargo run --bin cribo for latest development version")
         cmd = [
             "cargo",
             "run",
@@ -84,15 +179,58 @@ def run_cribo(entry_point: str, output_path: str, emit_requirements: bool = True
     if verbose:
         cmd.append("-v")
 
+    return cmd
+
+
+def cribo_binary_identity() -> Optional[str]:
+    """Identify the pre-built cribo binary that run_cribo will use.
+
+    Returns:
+        The binary's path, mtime and size, so rebuilding cribo changes the
+        identity; None when run_cribo falls back to ``cargo run``, whose
+        output can't be identified without building it
+    """
+    cargo_bin = os.environ.get("CARGO_BIN_EXE_cribo")
+    if not cargo_bin:
+        return None
+    try:
+        stat = os.stat(cargo_bin)
+    except FileNotFoundError:
+        return None
+    return f"{cargo_bin}\0{stat.st_mtime_ns}\0{stat.st_size}"
+
+
+def run_cribo(entry_point: str, output_path: str, emit_requirements: bool = False, tree_shake: bool = False, verbose: bool = False) -> subprocess.CompletedProcess:
+    """Run cribo to bundle a Python module.
+
+    Args:
+        entry_point: Path to the entry point Python file
+        output_path: Path where the bundled output should be saved
+        emit_requirements: Whether to generate requirements.txt (default: False)
+        tree_shake: Whether to enable tree-shaking (default: False)
+        verbose: Whether to show verbose output (default: False)
+
+    Returns:
+        CompletedProcess instance with the result of running cribo; stdout and
+        stderr are captured as bytes and only decoded here on failure
+    """
+    cmd = cribo_command(entry_point, output_path, emit_requirements=emit_requirements, tree_shake=tree_shake, verbose=verbose)
+
+    if verbose:
+        if cmd[0] == "cargo":
+            print("  Using cargo run --bin cribo for latest development version")
+        else:
+            print(f"  Using pre-built binary: {cmd[0]}")
+
     # Debug: print the command being run
     print(f"  Running command: {' '.join(cmd)}")
 
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=str(project_root))
+    result = subprocess.run(cmd, capture_output=True, cwd=str(_PROJECT_ROOT))
 
     if result.returncode != 0:
         print(f"Cribo failed with exit code {result.returncode}")
-        print(f"STDOUT:\n{result.stdout}")
-        print(f"STDERR:\n{result.stderr}")
+        print(f"STDOUT:\n{result.stdout.decode(errors='replace')}")
+        print(f"STDERR:\n{result.stderr.decode(errors='replace')}")
 
     return result
 
@@ -105,24 +243,23 @@ def run_bundled_test(bundled_path: str, test_script: str) -> subprocess.Complete
         test_script: Python code to execute for testing
 
     Returns:
-        CompletedProcess instance with the test result
+        CompletedProcess instance with the test result; stdout and stderr are
+        captured as bytes and only decoded here on failure
     """
-    original_sys_path = sys.path.copy()
-    try:
-        # Insert the bundle directory into sys.path
-        sys.path.insert(0, bundled_path)
+    # Insert the bundle directory into sys.path
+    with _pushed_sys_path(bundled_path):
+        result = subprocess.run([sys.executable, "-c", test_script], capture_output=True)
 
-        result = subprocess.run([sys.executable, "-c", test_script], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ Tests failed with exit code {result.returncode}")
+        print(f"STDOUT:\n{result.stdout.decode(errors='replace')}")
+        print(f"STDERR:\n{result.stderr.decode(errors='replace')}")
 
-        if result.returncode != 0:
-            print(f"❌ Tests failed with exit code {result.returncode}")
-            print(f"STDOUT:\n{result.stdout}")
-            print(f"STDERR:\n{result.stderr}")
+    return result
 
-        return result
-    finally:
-        # Restore the original sys.path
-        sys.path = original_sys_path
+
+# Largest unit first; sizes below the last threshold are shown in bytes
+_SIZE_UNITS = ((1 << 30, "GB"), (1 << 20, "MB"), (1 << 10, "KB"))
 
 
 def format_bundle_size(size_bytes: int) -> str:
@@ -134,18 +271,38 @@ def format_bundle_size(size_bytes: int) -> str:
     Returns:
         Formatted string with size
     """
-    if size_bytes < 1024:
-        return f"{size_bytes} bytes"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.1f} KB"
-    else:
-        return f"{size_bytes / (1024 * 1024):.1f} MB"
+    for threshold, unit in _SIZE_UNITS:
+        if size_bytes >= threshold:
+            return f"{size_bytes / threshold:.1f} {unit}"
+    return f"{size_bytes} bytes"
+
+
+def compile_bundle(bundle_path: Path) -> Path:
+    """Precompile a bundled file to a sibling .pyc so loads can skip parsing.
+
+    Args:
+        bundle_path: Path to the bundled Python file
+
+    Returns:
+        Path to the compiled .pyc file
+    """
+    pyc_path = bundle_path.with_suffix(".pyc")
+    py_compile.compile(str(bundle_path), cfile=str(pyc_path), doraise=True)
+    return pyc_path
+
+
+# Bundle stamp (resolved path, mtime_ns, size) of each module loaded by load_bundled_module
+_loaded_bundles: Dict[str, Tuple[str, int, int]] = {}
 
 
 @contextmanager
 def load_bundled_module(bundle_path: Path, module_name: str):
     """Context manager to safely load and unload a bundled module.
 
+    If the same bundle is already loaded under `module_name` by an enclosing
+    call, that module object is reused without re-executing it; only the
+    outermost call unloads it.
+
     Args:
         bundle_path: Path to the bundled Python file
         module_name: Name to give the loaded module
@@ -157,35 +314,40 @@ def load_bundled_module(bundle_path: Path, module_name: str):
         with load_bundled_module(Path("bundle.py"), "my_module") as module:
             module.some_function()
     """
-    bundle_dir = str(bundle_path.parent)
-    original_sys_path = sys.path.copy()
-
-    try:
-        # Add bundle directory to Python path
-        if bundle_dir not in sys.path:
-            sys.path.insert(0, bundle_dir)
-
-        # Load the module dynamically
-        spec = importlib.util.spec_from_file_location(module_name, bundle_path)
-        if spec is None or spec.loader is None:
-            raise ImportError(f"Failed to create module spec for {bundle_path}")
-
-        module = importlib.util.module_from_spec(spec)
-        sys.modules[module_name] = module
-        spec.loader.exec_module(module)
+    stat = bundle_path.stat()
+    stamp = (str(bundle_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    loaded = sys.modules.get(module_name)
+    if loaded is not None and _loaded_bundles.get(module_name) == stamp:
+        yield loaded
+        return
+
+    # Add bundle directory to Python path
+    with _pushed_sys_path(str(bundle_path.parent)):
+        try:
+            # Load the module dynamically, preferring bytecode from compile_bundle()
+            pyc_path = bundle_path.with_suffix(".pyc")
+            if pyc_path.exists() and pyc_path.stat().st_mtime_ns >= stat.st_mtime_ns:
+                loader = importlib.machinery.SourcelessFileLoader(module_name, str(pyc_path))
+                spec = importlib.util.spec_from_file_location(module_name, pyc_path, loader=loader)
+            else:
+                spec = importlib.util.spec_from_file_location(module_name, bundle_path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Failed to create module spec for {bundle_path}")
 
-        yield module
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+            _loaded_bundles[module_name] = stamp
 
-    finally:
-        # Clean up sys.modules
-        if module_name in sys.modules:
-            del sys.modules[module_name]
+            yield module
 
-        # Restore original sys.path
-        sys.path[:] = original_sys_path
+        finally:
+            # Clean up sys.modules
+            _loaded_bundles.pop(module_name, None)
+            sys.modules.pop(module_name, None)
 
 
-def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
+def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Tuple[Dict[str, Set[str]], bool]:
     """Parse pyproject.toml to extract dependencies.
 
     Args:
@@ -193,7 +355,8 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
         tomllib: The TOML parsing library (either tomllib or tomli)
 
     Returns:
-        Dictionary with 'install_requires' and 'extras_require' sets
+        Dictionary with 'install_requires' and 'extras_require' sets, and
+        whether parsing completed (False when it failed and the sets are empty)
     """
     try:
         with open(pyproject_path, "rb") as f:
@@ -205,13 +368,16 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
         # Import Requirement for robust PEP 508 parsing
         from packaging.requirements import Requirement
 
-        # Check for Poetry dependencies
-        if "tool" in data and "poetry" in data["tool"]:
-            poetry_data = data["tool"]["poetry"]
+        # Look up both layouts once; Poetry takes precedence over PEP 621
+        poetry_data = data.get("tool", {}).get("poetry")
+        project_data = data.get("project")
 
+        # Check for Poetry dependencies
+        if poetry_data is not None:
             # Process main dependencies
-            if "dependencies" in poetry_data:
-                for dep, spec in poetry_data["dependencies"].items():
+            dependencies = poetry_data.get("dependencies")
+            if dependencies:
+                for dep, spec in dependencies.items():
                     if dep.lower() == "python":
                         continue
                     # Handle both string specs and dict specs with optional=true
@@ -224,8 +390,9 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
                         install_requires.add(normalize_package_name(dep))
 
             # Process extras
-            if "extras" in poetry_data:
-                for extra_deps in poetry_data["extras"].values():
+            extras = poetry_data.get("extras")
+            if extras:
+                for extra_deps in extras.values():
                     for dep in extra_deps:
                         try:
                             # Parse with Requirement to extract clean package name
@@ -236,12 +403,11 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
                             extras_require.add(normalize_package_name(dep))
 
         # Check for standard PEP 621 dependencies
-        elif "project" in data:
-            project_data = data["project"]
-
+        elif project_data is not None:
             # Process dependencies
-            if "dependencies" in project_data:
-                for dep in project_data["dependencies"]:
+            dependencies = project_data.get("dependencies")
+            if dependencies:
+                for dep in dependencies:
                     try:
                         # Use robust parser for PEP 508 strings
                         req = Requirement(dep)
@@ -250,8 +416,9 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
                         print(f"Warning: Could not parse dependency '{dep}': {e}")
 
             # Process optional dependencies
-            if "optional-dependencies" in project_data:
-                for extra_deps in project_data["optional-dependencies"].values():
+            optional_dependencies = project_data.get("optional-dependencies")
+            if optional_dependencies:
+                for extra_deps in optional_dependencies.values():
                     for dep in extra_deps:
                         try:
                             # Use robust parser for PEP 508 strings
@@ -260,11 +427,11 @@ def _parse_pyproject_toml(pyproject_path: Path, tomllib) -> Dict[str, Set[str]]:
                         except Exception as e:
                             print(f"Warning: Could not parse optional dependency '{dep}': {e}")
 
-        return {"install_requires": install_requires, "extras_require": extras_require}
+        return {"install_requires": install_requires, "extras_require": extras_require}, True
 
     except Exception as e:
         print(f"Warning: Failed to parse pyproject.toml: {e}")
-        return {"install_requires": set(), "extras_require": set()}
+        return {"install_requires": set(), "extras_require": set()}, False
 
 
 def normalize_package_name(name: str) -> str:
@@ -279,41 +446,130 @@ def normalize_package_name(name: str) -> str:
     return name.lower().replace("_", "-")
 
 
-def parse_requirements_file(requirements_path: Path) -> Set[str]:
+# Leading distribution name of a requirement line; specifiers, extras, markers and URLs follow it.
+# PEP 508 names start and end with a letter or digit, so option lines (-e, -r, --hash=...) don't match
+_REQUIREMENT_NAME_RE = re.compile(rb"\s*([A-Za-z0-9](?:[A-Za-z0-9_.\-]*[A-Za-z0-9])?)")
+
+
+def parse_requirements_file(requirements_path: Path) -> FrozenSet[str]:
     """Parse a requirements.txt file and extract normalized package names.
 
     This parses the requirements.txt output from cribo, which should always
-    be well-formed package names (no version specifiers).
+    be well-formed package names. Version specifiers, extras, ``name @ URL``
+    references and environment markers are stripped, and comments and option
+    lines such as ``-e``, ``-r`` or ``--hash=...`` are skipped. Results are
+    cached per file and invalidated when its mtime or size changes.
 
     Args:
         requirements_path: Path to requirements.txt file
 
     Returns:
-        Set of normalized package names found in the file
+        Frozen set of normalized package names found in the file
     """
-    found_deps = set()
-    requirements_content = requirements_path.read_text().strip()
+    stat = requirements_path.stat()
+    return _parse_requirements_file_cached(str(requirements_path.resolve()), stat.st_mtime_ns, stat.st_size)
 
-    for line in requirements_content.splitlines():
-        line = line.strip()
-        if line and not line.startswith("#"):
-            # Cribo outputs clean package names without version specifiers
-            found_deps.add(normalize_package_name(line))
 
-    return found_deps
+@functools.lru_cache(maxsize=32)
+def _parse_requirements_file_cached(requirements_path: str, mtime_ns: int, size: int) -> FrozenSet[str]:
+    """Cached worker for parse_requirements_file; mtime_ns and size only key the cache."""
+    # Stream the file line by line instead of materializing its text and line list
+    # Read bytes: names are ASCII, so only the matched names need decoding
+    with open(requirements_path, "rb") as f:
+        # Cribo outputs clean package names; match just the name, skipping comments and option lines
+        matches = (_REQUIREMENT_NAME_RE.match(line) for line in f if not line.lstrip().startswith(b"#"))
+        return frozenset(normalize_package_name(match.group(1).decode("ascii")) for match in matches if match)
 
 
-def get_package_requirements(package_root: Path) -> Dict[str, Set[str]]:
+def get_package_requirements(package_root: Path) -> Mapping[str, FrozenSet[str]]:
     """Extract requirements from a package's setup.py or pyproject.toml.
 
+    Metadata is parsed once per package root and cached until the root's
+    pyproject.toml or setup.py changes (by mtime or size), or the parser
+    itself changes. Other files setup.py reads are not tracked; run pytest
+    with ``--cache-clear`` after editing one.
+
     Args:
         package_root: Root directory of the package containing setup.py or pyproject.toml
 
     Returns:
-        Dictionary with 'install_requires' and 'extras_require' sets
+        Read-only mapping with 'install_requires' and 'extras_require' frozen sets
+    """
+    root = package_root.resolve()
+    return _cached_package_requirements(_package_metadata_key(root))
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_package_requirements(key: Tuple) -> Mapping[str, FrozenSet[str]]:
+    """Cached worker for get_package_requirements; key is from _package_metadata_key.
+
+    Within a process the lru_cache answers repeat calls; across sessions a JSON
+    file under target/tmp skips re-executing setup.py while the key still
+    matches. The result is shared by every caller, so it is frozen rather
+    than copied.
+    """
+    root = Path(key[1])
+    cache_path = ensure_test_directories(per_worker=False) / "requirements_cache" / f"{root.name}.json"
+
+    requirements = _load_requirements_cache(cache_path, key)
+    if requirements is None:
+        requirements, complete = _read_package_requirements(root)
+        # Empty fallbacks after an error (missing packaging, a failing setup.py)
+        # depend on this environment, so only persist a complete parse
+        if complete:
+            _write_requirements_cache(cache_path, key, requirements)
+
+    return MappingProxyType({kind: frozenset(names) for kind, names in requirements.items()})
+
+
+# Bump whenever _read_package_requirements changes what it returns, so stale on-disk caches are ignored
+_REQUIREMENTS_CACHE_VERSION = 2
+
+
+def _package_metadata_key(package_root: Path) -> Tuple:
+    """Identify the parser version and the state of a package's metadata files by path, mtime and size."""
+    files = []
+    for name in ("pyproject.toml", "setup.py"):
+        try:
+            stat = (package_root / name).stat()
+        except FileNotFoundError:
+            continue
+        files.append((name, stat.st_mtime_ns, stat.st_size))
+    return (_REQUIREMENTS_CACHE_VERSION, str(package_root), *files)
+
+
+def _load_requirements_cache(cache_path: Path, key: Tuple) -> Optional[Dict[str, Set[str]]]:
+    """Return the cached requirements if cache_path was written for the same key."""
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # JSON turns the key's tuples into lists
+    if tuple(tuple(part) if isinstance(part, list) else part for part in cached.get("key", ())) != key:
+        return None
+    return {name: set(packages) for name, packages in cached["requirements"].items()}
+
+
+def _write_requirements_cache(cache_path: Path, key: Tuple, requirements: Dict[str, Set[str]]) -> None:
+    """Write the requirements cache atomically, so concurrent readers never see a partial file."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "requirements": {name: sorted(packages) for name, packages in requirements.items()}}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def _read_package_requirements(package_root: Path) -> Tuple[Dict[str, Set[str]], bool]:
+    """Read requirements from pyproject.toml, falling back to setup.py.
+
+    Returns:
+        The requirements, and whether they were read completely rather than
+        falling back to empty sets after an error
     """
     # First try pyproject.toml if it exists
     pyproject_toml = package_root / "pyproject.toml"
+    toml_skipped = False
     if pyproject_toml.exists():
         try:
             import tomllib
@@ -322,7 +578,7 @@ def get_package_requirements(package_root: Path) -> Dict[str, Set[str]]:
                 import tomli as tomllib
             except ImportError:
                 # Fall back to setup.py if no TOML parser available
-                pass
+                toml_skipped = True
             else:
                 return _parse_pyproject_toml(pyproject_toml, tomllib)
         else:
@@ -331,9 +587,72 @@ def get_package_requirements(package_root: Path) -> Dict[str, Set[str]]:
     # Fall back to setup.py
     setup_py = package_root / "setup.py"
     if not setup_py.exists():
-        return {"install_requires": set(), "extras_require": set()}
+        return {"install_requires": set(), "extras_require": set()}, not toml_skipped
+
+    try:
+        with open(setup_py, "r") as f:
+            source = f.read()
+
+        # Most setup.py files pass their requirements as literals; read those
+        # from the AST and only execute the file when they are computed
+        requirements = _literal_setup_requirements(source, str(setup_py))
+        if requirements is None:
+            requirements = _execute_setup_py(setup_py, source)
 
-    # Create a minimal setuptools mock to capture requirements
+        return _normalize_setup_requirements(requirements), not toml_skipped
+
+    except Exception as e:
+        print(f"Warning: Failed to parse setup.py: {e}")
+        return {"install_requires": set(), "extras_require": set()}, False
+
+
+def _literal_setup_requirements(source: str, filename: str) -> Optional[Dict]:
+    """Extract literal install_requires/extras_require from the single setup() call in source.
+
+    Returns:
+        Raw requirements, or None when there isn't exactly one setup() call or
+        its requirements aren't literals (so setup.py has to be executed)
+    """
+    calls = [node for node in ast.walk(ast.parse(source, filename)) if isinstance(node, ast.Call) and _called_name(node.func) == "setup"]
+    if len(calls) != 1:
+        return None
+
+    requirements = {"install_requires": [], "extras_require": {}}
+    for keyword in calls[0].keywords:
+        # setup(**kwargs) may carry requirements we can't see
+        if keyword.arg is None:
+            return None
+        if keyword.arg in requirements:
+            try:
+                requirements[keyword.arg] = ast.literal_eval(keyword.value)
+            except (ValueError, TypeError):
+                return None
+    return requirements
+
+
+def _called_name(func: ast.expr) -> Optional[str]:
+    """Name of a called function, for both ``setup(...)`` and ``setuptools.setup(...)``."""
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _mock_find_packages(**kwargs):
+    """Mock find_packages function."""
+    return []
+
+
+# Stand-in for setuptools while executing setup.py; built once and given a
+# fresh setup() per call by _execute_setup_py
+_SETUPTOOLS_MOCK = ModuleType("setuptools")
+_SETUPTOOLS_MOCK.find_packages = _mock_find_packages
+
+
+def _execute_setup_py(setup_py: Path, source: str) -> Dict:
+    """Execute setup.py against a setuptools mock and return the requirements it passes to setup()."""
+    # Filled in by this call's mock setup()
     requirements = {"install_requires": [], "extras_require": {}}
 
     def mock_setup(**kwargs):
@@ -343,78 +662,68 @@ def get_package_requirements(package_root: Path) -> Dict[str, Set[str]]:
         if "extras_require" in kwargs:
             requirements["extras_require"] = kwargs["extras_require"]
 
-    def mock_find_packages(**kwargs):
-        """Mock find_packages function."""
-        return []
-
     # Prepare the environment
-    original_sys_path = sys.path.copy()
-    original_sys_argv = sys.argv.copy()
-    original_modules = dict(sys.modules)
+    original_sys_argv = sys.argv
+    # Only setuptools is replaced, so only it needs restoring
+    original_setuptools = sys.modules.get("setuptools")
 
     try:
-        # Change to package directory
-        sys.path.insert(0, str(package_root))
         sys.argv = ["setup.py", "egg_info"]
 
-        # Create mock setuptools module
-        import types
-
-        setuptools_mock = types.ModuleType("setuptools")
-        setuptools_mock.setup = mock_setup
-        setuptools_mock.find_packages = mock_find_packages
-        sys.modules["setuptools"] = setuptools_mock
+        # Install the shared setuptools mock, pointed at this call's setup()
+        _SETUPTOOLS_MOCK.setup = mock_setup
+        sys.modules["setuptools"] = _SETUPTOOLS_MOCK
 
         # Create a namespace with our mock
         namespace = {
             "__file__": str(setup_py),
             "__name__": "__main__",
             "setup": mock_setup,
-            "setuptools": setuptools_mock,
-            "find_packages": mock_find_packages,
+            "setuptools": _SETUPTOOLS_MOCK,
+            "find_packages": _SETUPTOOLS_MOCK.find_packages,
             "sys": sys,
             "os": __import__("os"),
             "open": open,
         }
 
-        # Execute setup.py
-        with open(setup_py, "r") as f:
-            code = compile(f.read(), str(setup_py), "exec")
+        # Execute setup.py with its package directory importable
+        code = compile(source, str(setup_py), "exec")
+        with _pushed_sys_path(str(setup_py.parent)):
             exec(code, namespace)
 
-        from packaging.requirements import Requirement
+        return requirements
+    finally:
+        sys.argv = original_sys_argv
+        # Restore original modules
+        if original_setuptools is not None:
+            sys.modules["setuptools"] = original_setuptools
+        else:
+            sys.modules.pop("setuptools", None)
 
-        # Parse requirements to extract normalized package names
-        install_requires = set()
-        for req in requirements.get("install_requires", []):
+
+def _normalize_setup_requirements(requirements: Dict) -> Dict[str, Set[str]]:
+    """Reduce raw setup() requirement strings to normalized package names."""
+    from packaging.requirements import Requirement
+
+    # Parse requirements to extract normalized package names
+    install_requires = set()
+    for req in requirements.get("install_requires", []):
+        try:
+            # Use robust parser for PEP 508 strings
+            parsed_req = Requirement(req)
+            install_requires.add(normalize_package_name(parsed_req.name))
+        except Exception as e:
+            print(f"Warning: Could not parse requirement '{req}': {e}")
+
+    # Collect all extras
+    extras_require = set()
+    for extra_reqs in requirements.get("extras_require", {}).values():
+        for req in extra_reqs:
             try:
                 # Use robust parser for PEP 508 strings
                 parsed_req = Requirement(req)
-                install_requires.add(normalize_package_name(parsed_req.name))
+                extras_require.add(normalize_package_name(parsed_req.name))
             except Exception as e:
-                print(f"Warning: Could not parse requirement '{req}': {e}")
-
-        # Collect all extras
-        extras_require = set()
-        for extra_reqs in requirements.get("extras_require", {}).values():
-            for req in extra_reqs:
-                try:
-                    # Use robust parser for PEP 508 strings
-                    parsed_req = Requirement(req)
-                    extras_require.add(normalize_package_name(parsed_req.name))
-                except Exception as e:
-                    print(f"Warning: Could not parse extra requirement '{req}': {e}")
-
-        return {"install_requires": install_requires, "extras_require": extras_require}
+                print(f"Warning: Could not parse extra requirement '{req}': {e}")
 
-    except Exception as e:
-        print(f"Warning: Failed to parse setup.py: {e}")
-        return {"install_requires": set(), "extras_require": set()}
-    finally:
-        sys.path[:] = original_sys_path
-        sys.argv[:] = original_sys_argv
-        # Restore original modules
-        if "setuptools" in original_modules:
-            sys.modules["setuptools"] = original_modules["setuptools"]
-        elif "setuptools" in sys.modules:
-            del sys.modules["setuptools"]
+    return {"install_requires": install_requires, "extras_require": extras_require}